@@ -1,20 +1,44 @@
 import streamlit as st
+import functools
 import hashlib
+import secrets
+import struct
+import sys
 import time
+from collections import deque
+from itertools import islice
 from datetime import datetime
-from cryptography.fernet import Fernet
 import threading
-import uuid
-from typing import Dict, Optional
+from typing import NamedTuple, Optional
 import re
 import html
 
 # ====================
 # IN-MEMORY GLOBAL STATE
 # ====================
+class Message(NamedTuple):
+    # Fixed fields, no per-message dict: rooms hold up to MAX_MESSAGES of these
+    message_id: str
+    user_id: str
+    encrypted_message: bytes
+    timestamp_ns: int
+    time_str: str
+    user_label: str
+    # Chain link, filled in by add_message under the state lock
+    hash: bytes = b""
+    previous_hash: bytes = b""
+
+class RoomSnapshot(NamedTuple):
+    # What readers need from a room, copied out under the lock
+    name: str
+    messages: tuple
+    count: int
+
 class InMemoryGlobalState:
     _lock = threading.Lock()
     _instance = None
+    MAX_MESSAGES = 200
+    ROOM_TTL = 30 * 60
     
     def __new__(cls):
         if cls._instance is None:
@@ -25,40 +49,102 @@ class InMemoryGlobalState:
     def _initialize(self):
         self.ROOMS = {}
         self.ACTIVE_USERS = {}
-        self.ROOM_KEYS = {}
+        self.ROOM_CIPHERS = {}
         self.USER_LAST_MESSAGE = {}
-        self.ROOM_CREATED_AT = {}
+        self.ROOM_LAST_ACTIVE = {}
+        self.ROOM_BUBBLES = {}
+    
+    def _evict_expired_rooms(self):
+        # Caller must hold the lock
+        current_time = time.time()
+        expired = [
+            room_id for room_id, last_active in self.ROOM_LAST_ACTIVE.items()
+            if current_time - last_active >= self.ROOM_TTL
+        ]
+        for room_id in expired:
+            self.ROOMS.pop(room_id, None)
+            self.ACTIVE_USERS.pop(room_id, None)
+            self.ROOM_LAST_ACTIVE.pop(room_id, None)
+            # Release decrypted text as soon as the room goes, not at the next GC
+            cipher = self.ROOM_CIPHERS.pop(room_id, None)
+            if cipher is not None:
+                cipher.decrypt_cached.cache_clear()
+                cipher.hash_prefix.cache_clear()
+            bubbles = self.ROOM_BUBBLES.pop(room_id, None)
+            if bubbles is not None:
+                bubbles.cache_clear()
+        self.USER_LAST_MESSAGE = {
+            user_id: last_message
+            for user_id, last_message in self.USER_LAST_MESSAGE.items()
+            if current_time - last_message < 1.0
+        }
+    
+    def get_room(self, room_id: str, limit: Optional[int] = None) -> Optional[RoomSnapshot]:
+        with self._lock:
+            last_active = self.ROOM_LAST_ACTIVE.get(room_id)
+            if last_active is not None and time.time() - last_active >= self.ROOM_TTL:
+                self._evict_expired_rooms()
+            room = self.ROOMS.get(room_id)
+            if room is None:
+                return None
+            # Snapshot under the lock; the live deque may grow mid-render. Only
+            # the newest `limit` messages are copied, since that is all a
+            # poll tick renders
+            messages = room.get("messages", ())
+            count = len(messages)
+            start = 0 if limit is None else max(0, count - limit)
+            return RoomSnapshot(room.get("name", "Unknown"), tuple(islice(messages, start, None)), count)
+    
+    def get_room_name(self, room_id: str) -> Optional[str]:
+        # Existence check for joins; skips copying the message history
+        with self._lock:
+            last_active = self.ROOM_LAST_ACTIVE.get(room_id)
+            if last_active is None or time.time() - last_active >= self.ROOM_TTL:
+                return None
+            return self.ROOMS[room_id].get("name", "Unknown")
     
-    def get_room(self, room_id: str):
+    def get_bubble_cache(self, room_id: str, factory):
+        # Per-room render memo for the chat layer, dropped with the room
         with self._lock:
-            return self.ROOMS.get(room_id, {}).copy()
+            if room_id not in self.ROOMS:
+                return None
+            bubbles = self.ROOM_BUBBLES.get(room_id)
+            if bubbles is None:
+                bubbles = self.ROOM_BUBBLES[room_id] = factory()
+            return bubbles
     
-    def add_message(self, room_id: str, message_data: Dict):
+    def add_message(self, room_id: str, message: Message, prefix) -> bool:
         with self._lock:
             if room_id not in self.ROOMS:
                 return False
             if "messages" not in self.ROOMS[room_id]:
-                self.ROOMS[room_id]["messages"] = []
+                self.ROOMS[room_id]["messages"] = deque(maxlen=self.MAX_MESSAGES)
             
             messages = self.ROOMS[room_id]["messages"]
-            messages.append(message_data)
-            if len(messages) > 200:
-                self.ROOMS[room_id]["messages"] = messages[-200:]
+            # Link to the tail while holding the lock, so concurrent senders
+            # chain one after another and every link holds by construction
+            prev_hash = messages[-1].hash if messages else GENESIS_HASH
+            curr_hash = EncryptionHandler.calculate_hash(
+                prefix, message.encrypted_message, message.timestamp_ns, prev_hash
+            )
+            messages.append(message._replace(hash=curr_hash, previous_hash=prev_hash))
+            # The TTL counts from the last message, so busy rooms stay open
+            self.ROOM_LAST_ACTIVE[room_id] = time.time()
             return True
     
     def create_room(self, room_id: str, room_name: str):
         with self._lock:
+            self._evict_expired_rooms()
             if room_id not in self.ROOMS:
-                room_key = Fernet.generate_key()
                 self.ROOMS[room_id] = {
-                    "messages": [],
+                    "messages": deque(maxlen=self.MAX_MESSAGES),
                     "created_at": time.time(),
                     "name": room_name,
                     "room_id": room_id,
                 }
                 self.ACTIVE_USERS[room_id] = {}
-                self.ROOM_KEYS[room_id] = room_key
-                self.ROOM_CREATED_AT[room_id] = time.time()
+                self.ROOM_CIPHERS[room_id] = EncryptionHandler(EncryptionHandler.generate_key())
+                self.ROOM_LAST_ACTIVE[room_id] = time.time()
                 return True
             return False
     
@@ -89,9 +175,9 @@ class InMemoryGlobalState:
                 if current_time - last_seen < 30
             }
     
-    def get_room_key(self, room_id: str) -> Optional[bytes]:
+    def get_room_cipher(self, room_id: str) -> Optional["EncryptionHandler"]:
         with self._lock:
-            return self.ROOM_KEYS.get(room_id)
+            return self.ROOM_CIPHERS.get(room_id)
     
     def check_rate_limit(self, user_id: str) -> bool:
         with self._lock:
@@ -109,19 +195,55 @@ def get_global_state():
 # ====================
 # ENCRYPTION
 # ====================
+@functools.cache
+def _aesgcm_cls():
+    # cryptography pulls in its whole OpenSSL binding; defer it until a
+    # channel actually needs a cipher so the landing page loads faster.
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    return AESGCM
+
 class EncryptionHandler:
+    NONCE_SIZE = 12
+    # Fixed-width link fields after the ciphertext: timestamp_ns, previous_hash
+    LINK_FIELDS = struct.Struct('<Q32s')
+    
     def __init__(self, key: bytes):
-        self.cipher = Fernet(key)
+        self.aead = _aesgcm_cls()(key)
+        # Stored ciphertexts never change. Memoize on the instance: it lives in
+        # the cached global state, whereas module-level caches in this script
+        # are rebuilt on every Streamlit rerun.
+        self.decrypt_cached = functools.lru_cache(maxsize=256)(self.decrypt)
+        self.hash_prefix = functools.lru_cache(maxsize=64)(self._hash_prefix)
+    
+    @staticmethod
+    def generate_key() -> bytes:
+        return _aesgcm_cls().generate_key(bit_length=256)
     
-    def encrypt(self, plaintext: str) -> str:
-        return self.cipher.encrypt(plaintext.encode()).decode()
+    def encrypt(self, plaintext: str) -> bytes:
+        nonce = secrets.token_bytes(self.NONCE_SIZE)
+        return nonce + self.aead.encrypt(nonce, plaintext.encode(), None)
     
-    def decrypt(self, ciphertext: str) -> str:
-        return self.cipher.decrypt(ciphertext.encode()).decode()
+    def decrypt(self, ciphertext: bytes) -> str:
+        nonce, data = ciphertext[:self.NONCE_SIZE], ciphertext[self.NONCE_SIZE:]
+        return self.aead.decrypt(nonce, data, None).decode()
     
     @staticmethod
-    def calculate_hash(data: str) -> str:
-        return hashlib.sha256(data.encode()).hexdigest()
+    def _hash_prefix(room_id: str, user_id: bytes):
+        # Sender and room never change within a chain, so absorb them once
+        # and let calculate_hash copy the state per message.
+        prefix = hashlib.blake2b(digest_size=32)
+        prefix.update(user_id)
+        prefix.update(room_id.encode())
+        return prefix
+    
+    @staticmethod
+    def calculate_hash(prefix, ciphertext: bytes, timestamp_ns: int, previous_hash: bytes) -> bytes:
+        h = prefix.copy()
+        h.update(ciphertext)
+        h.update(EncryptionHandler.LINK_FIELDS.pack(timestamp_ns, previous_hash))
+        return h.digest()
+
+GENESIS_HASH = bytes(32)
 
 def sanitize_message(message: str) -> str:
     message = html.escape(message)
@@ -131,378 +253,464 @@ def sanitize_message(message: str) -> str:
 # ====================
 # STYLING - SIMPLIFIED & ROBUST
 # ====================
-def inject_styles():
-    st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;700&family=Space+Grotesk:wght@400;600;700&display=swap');
-    
-    * {
-        box-sizing: border-box;
-    }
-    
-    .stApp {
-        background: #000000;
-        background-image: linear-gradient(180deg, #0a0a0f 0%, #000000 100%);
-        color: #ffffff;
-        font-family: 'Inter', sans-serif;
-    }
-    
-    .main .block-container {
-        padding-top: 2rem;
-        padding-bottom: 2rem;
-        max-width: 1200px;
-    }
-    
-    /* Header */
-    .hero-container {
-        padding: 2rem 0 3rem 0;
-        margin-bottom: 2rem;
-        border-bottom: 1px solid rgba(138, 99, 210, 0.3);
-        animation: fadeIn 0.8s ease-in;
-    }
-    
-    .de-studio {
-        font-family: 'Space Grotesk', sans-serif;
-        color: #8a63d2;
-        font-size: 0.9rem;
-        letter-spacing: 0.3em;
-        text-transform: uppercase;
-        margin-bottom: 1rem;
-        font-weight: 600;
-        display: block;
-        text-shadow: 0 0 10px rgba(138, 99, 210, 0.5);
-    }
-    
-    .main-title {
-        font-family: 'Inter', sans-serif;
-        font-size: 3rem;
-        font-weight: 700;
-        color: #ffffff;
-        margin: 0;
-        line-height: 1.2;
-        background: linear-gradient(135deg, #ffffff 0%, #a78bfa 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-    }
-    
-    .title-accent {
-        font-size: 1.2rem;
-        font-weight: 300;
-        opacity: 0.8;
-        display: block;
-        margin-top: 0.5rem;
-    }
-    
-    .tagline {
-        color: rgba(255, 255, 255, 0.7);
-        margin-top: 1rem;
-        font-size: 1rem;
-        line-height: 1.6;
-    }
-    
-    /* Cards */
-    .creation-card {
-        background: rgba(20, 20, 25, 0.9);
-        border: 1px solid rgba(138, 99, 210, 0.3);
-        border-radius: 16px;
-        padding: 2rem;
-        margin-bottom: 2rem;
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.5);
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-    }
-    
-    .creation-card:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 8px 30px rgba(138, 99, 210, 0.2);
-        border-color: rgba(138, 99, 210, 0.6);
-    }
-    
-    .card-title {
-        color: #8a63d2;
-        font-family: 'Space Grotesk', sans-serif;
-        font-size: 0.9rem;
-        letter-spacing: 0.1em;
-        text-transform: uppercase;
-        margin-bottom: 1.5rem;
-        font-weight: 600;
-        border-bottom: 2px solid rgba(138, 99, 210, 0.3);
-        padding-bottom: 0.5rem;
-        display: inline-block;
-    }
-    
-    /* Inputs */
-    .stTextInput > div > div > input {
-        background: rgba(255, 255, 255, 0.05) !important;
-        border: 1px solid rgba(255, 255, 255, 0.2) !important;
-        color: #ffffff !important;
-        border-radius: 8px !important;
-        padding: 0.75rem 1rem !important;
-        font-size: 0.95rem !important;
-        transition: all 0.3s !important;
-    }
-    
-    .stTextInput > div > div > input:focus {
-        border-color: #8a63d2 !important;
-        box-shadow: 0 0 0 2px rgba(138, 99, 210, 0.3) !important;
-    }
-    
-    /* Buttons */
-    .stButton > button {
-        background: linear-gradient(135deg, #8a63d2 0%, #6d28d9 100%) !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 8px !important;
-        padding: 0.75rem 1.5rem !important;
-        font-weight: 600 !important;
-        font-size: 0.9rem !important;
-        width: 100% !important;
-        transition: all 0.3s !important;
-        cursor: pointer !important;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(138, 99, 210, 0.4) !important;
-        opacity: 0.9;
-    }
-    
-    /* Chat */
-    .chat-container {
-        background: rgba(20, 20, 25, 0.9);
-        border: 1px solid rgba(255, 255, 255, 0.1);
-        border-radius: 16px;
-        padding: 1.5rem;
-        max-height: 500px;
-        overflow-y: auto;
-        margin-top: 1rem;
-    }
-    
-    .message {
-        background: rgba(255, 255, 255, 0.03);
-        border-left: 3px solid #8a63d2;
-        padding: 1rem;
-        margin-bottom: 1rem;
-        border-radius: 0 12px 12px 0;
-        animation: slideIn 0.3s ease-out;
-    }
-    
-    .message-own {
-        border-left-color: #10b981;
-        background: rgba(16, 185, 129, 0.05);
-    }
-    
-    .message-header {
-        display: flex;
-        justify-content: space-between;
-        margin-bottom: 0.5rem;
-        font-size: 0.8rem;
-        color: #8a63d2;
-        font-weight: 600;
-    }
-    
-    .message-time {
-        color: rgba(255, 255, 255, 0.5);
-        font-weight: 400;
-    }
-    
-    .message-content {
-        color: rgba(255, 255, 255, 0.9);
-        line-height: 1.5;
-        font-size: 0.95rem;
-    }
-    
-    .message-meta {
-        font-size: 0.7rem;
-        color: rgba(255, 255, 255, 0.4);
-        margin-top: 0.5rem;
-    }
-    
-    /* Room Header */
-    .room-header {
-        background: rgba(138, 99, 210, 0.1);
-        border: 1px solid rgba(138, 99, 210, 0.3);
-        border-radius: 12px;
-        padding: 1rem;
-        margin-bottom: 1rem;
-    }
-    
-    .room-title {
-        font-size: 1.2rem;
-        font-weight: 600;
-        color: #ffffff;
-        margin: 0;
-    }
-    
-    .room-id {
-        color: #8a63d2;
-        font-family: monospace;
-        font-size: 0.9rem;
-    }
-    
-    .status-bar {
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-        color: #10b981;
-        font-size: 0.8rem;
-        margin-top: 0.5rem;
-    }
-    
-    .status-dot {
-        width: 8px;
-        height: 8px;
-        background: #10b981;
-        border-radius: 50%;
-        animation: pulse 2s infinite;
-        display: inline-block;
-    }
-    
-    /* Input Area */
-    .input-area {
-        background: rgba(20, 20, 25, 0.9);
-        padding: 1rem;
-        border-radius: 12px;
-        border: 1px solid rgba(255, 255, 255, 0.1);
-        margin-top: 1rem;
-    }
-    
-    /* Animations */
-    @keyframes fadeIn {
-        from { opacity: 0; }
-        to { opacity: 1; }
-    }
-    
-    @keyframes slideIn {
-        from { 
-            opacity: 0; 
-            transform: translateX(-20px); 
-        }
-        to { 
-            opacity: 1; 
-            transform: translateX(0); 
-        }
-    }
-    
-    @keyframes pulse {
-        0%, 100% { opacity: 1; }
-        50% { opacity: 0.5; }
-    }
-    
-    /* Scrollbar */
-    ::-webkit-scrollbar {
-        width: 8px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: rgba(255, 255, 255, 0.05);
-        border-radius: 4px;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: #8a63d2;
-        border-radius: 4px;
+_FONTS_URL = "https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;700&display=swap"
+# Space Grotesk only sets the uppercase "DE STUDIO" / card titles at 600, so
+# request just those glyphs; Inter renders user text and stays complete
+_DISPLAY_FONT_URL = "https://fonts.googleapis.com/css2?family=Space+Grotesk:wght@600&display=swap&text=%20ACDEHIJLNORSTU"
+
+# Linked rather than @import-ed so the font fetch is not serialised behind
+# parsing the stylesheet, and the gstatic handshake starts straight away
+_FONT_LINKS = (
+    '<link rel="preconnect" href="https://fonts.googleapis.com">'
+    '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>'
+    f'<link rel="stylesheet" href="{_FONTS_URL}">'
+    f'<link rel="stylesheet" href="{_DISPLAY_FONT_URL}">'
+)
+
+_CSS_RAW = """
+* {
+    box-sizing: border-box;
+}
+
+.stApp {
+    background-image: linear-gradient(180deg, #0a0a0f 0%, #000000 100%);
+    font-family: 'Inter', sans-serif;
+}
+
+.main .block-container {
+    padding-top: 2rem;
+    padding-bottom: 2rem;
+    max-width: 1200px;
+}
+
+/* Header */
+.hero-container {
+    padding: 2rem 0 3rem 0;
+    margin-bottom: 2rem;
+    border-bottom: 1px solid rgba(138, 99, 210, 0.3);
+}
+
+.de-studio {
+    font-family: 'Space Grotesk', sans-serif;
+    color: #8a63d2;
+    font-size: 0.9rem;
+    letter-spacing: 0.3em;
+    text-transform: uppercase;
+    margin-bottom: 1rem;
+    font-weight: 600;
+    display: block;
+    text-shadow: 0 0 10px rgba(138, 99, 210, 0.5);
+}
+
+.main-title {
+    font-family: 'Inter', sans-serif;
+    font-size: 3rem;
+    font-weight: 700;
+    color: #ffffff;
+    margin: 0;
+    line-height: 1.2;
+    background: linear-gradient(135deg, #ffffff 0%, #a78bfa 100%);
+    -webkit-background-clip: text;
+    -webkit-text-fill-color: transparent;
+    background-clip: text;
+}
+
+.title-accent {
+    font-size: 1.2rem;
+    font-weight: 300;
+    opacity: 0.8;
+    display: block;
+    margin-top: 0.5rem;
+}
+
+.tagline {
+    color: rgba(255, 255, 255, 0.7);
+    margin-top: 1rem;
+    font-size: 1rem;
+    line-height: 1.6;
+}
+
+/* Cards */
+.creation-card {
+    background: rgba(20, 20, 25, 0.9);
+    border: 1px solid rgba(138, 99, 210, 0.3);
+    border-radius: 16px;
+    padding: 2rem;
+    margin-bottom: 2rem;
+    box-shadow: 0 4px 20px rgba(0, 0, 0, 0.5);
+    transition: transform 0.3s ease, box-shadow 0.3s ease;
+}
+
+.creation-card:hover {
+    transform: translateY(-3px);
+    box-shadow: 0 8px 30px rgba(138, 99, 210, 0.2);
+    border-color: rgba(138, 99, 210, 0.6);
+}
+
+.card-title {
+    color: #8a63d2;
+    font-family: 'Space Grotesk', sans-serif;
+    font-size: 0.9rem;
+    letter-spacing: 0.1em;
+    text-transform: uppercase;
+    margin-bottom: 1.5rem;
+    font-weight: 600;
+    border-bottom: 2px solid rgba(138, 99, 210, 0.3);
+    padding-bottom: 0.5rem;
+    display: inline-block;
+}
+
+/* Inputs */
+.stTextInput > div > div > input {
+    background: rgba(255, 255, 255, 0.05) !important;
+    border: 1px solid rgba(255, 255, 255, 0.2) !important;
+    color: #ffffff !important;
+    border-radius: 8px !important;
+    padding: 0.75rem 1rem !important;
+    font-size: 0.95rem !important;
+    transition: border-color 0.3s, box-shadow 0.3s !important;
+}
+
+.stTextInput > div > div > input:focus {
+    border-color: #8a63d2 !important;
+    box-shadow: 0 0 0 2px rgba(138, 99, 210, 0.3) !important;
+}
+
+/* Buttons */
+.stButton > button {
+    background: linear-gradient(135deg, #8a63d2 0%, #6d28d9 100%) !important;
+    color: white !important;
+    border: none !important;
+    border-radius: 8px !important;
+    padding: 0.75rem 1.5rem !important;
+    font-weight: 600 !important;
+    font-size: 0.9rem !important;
+    width: 100% !important;
+    transition: transform 0.3s, box-shadow 0.3s, opacity 0.3s !important;
+    cursor: pointer !important;
+}
+
+.stButton > button:hover {
+    transform: translateY(-2px);
+    box-shadow: 0 6px 20px rgba(138, 99, 210, 0.4) !important;
+    opacity: 0.9;
+}
+
+/* Chat */
+.chat-container {
+    background: rgba(20, 20, 25, 0.9);
+    border: 1px solid rgba(255, 255, 255, 0.1);
+    border-radius: 16px;
+    padding: 1.5rem;
+    max-height: 500px;
+    overflow-y: auto;
+    margin-top: 1rem;
+}
+
+.message {
+    background: rgba(255, 255, 255, 0.03);
+    border-left: 3px solid #8a63d2;
+    padding: 1rem;
+    margin-bottom: 1rem;
+    border-radius: 0 12px 12px 0;
+}
+
+.message-own {
+    border-left-color: #10b981;
+    background: rgba(16, 185, 129, 0.05);
+}
+
+.message-header {
+    display: flex;
+    justify-content: space-between;
+    margin-bottom: 0.5rem;
+    font-size: 0.8rem;
+    color: #8a63d2;
+    font-weight: 600;
+}
+
+.message-time {
+    color: rgba(255, 255, 255, 0.5);
+    font-weight: 400;
+}
+
+.message-content {
+    color: rgba(255, 255, 255, 0.9);
+    line-height: 1.5;
+    font-size: 0.95rem;
+}
+
+.message-meta {
+    font-size: 0.7rem;
+    color: rgba(255, 255, 255, 0.4);
+    margin-top: 0.5rem;
+}
+
+/* Room Header */
+.room-header {
+    background: rgba(138, 99, 210, 0.1);
+    border: 1px solid rgba(138, 99, 210, 0.3);
+    border-radius: 12px;
+    padding: 1rem;
+    margin-bottom: 1rem;
+}
+
+.room-title {
+    font-size: 1.2rem;
+    font-weight: 600;
+    color: #ffffff;
+    margin: 0;
+}
+
+.room-id {
+    color: #8a63d2;
+    font-family: monospace;
+    font-size: 0.9rem;
+}
+
+.status-bar {
+    display: flex;
+    align-items: center;
+    gap: 0.5rem;
+    color: #10b981;
+    font-size: 0.8rem;
+    margin-top: 0.5rem;
+}
+
+.status-dot {
+    width: 8px;
+    height: 8px;
+    background: #10b981;
+    border-radius: 50%;
+    display: inline-block;
+}
+
+/* Input Area */
+.input-area {
+    background: rgba(20, 20, 25, 0.9);
+    padding: 1rem;
+    border-radius: 12px;
+    border: 1px solid rgba(255, 255, 255, 0.1);
+    margin-top: 1rem;
+}
+
+/* Animations */
+@keyframes fadeIn {
+    from { opacity: 0; }
+    to { opacity: 1; }
+}
+
+@keyframes slideIn {
+    from { 
+        opacity: 0; 
+        transform: translateX(-20px); 
     }
-    
-    /* Hide default */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
-    /* Responsive */
-    @media (max-width: 768px) {
-        .main-title { font-size: 2rem; }
-        .creation-card { padding: 1.5rem; }
+    to { 
+        opacity: 1; 
+        transform: translateX(0); 
     }
-    </style>
-    """, unsafe_allow_html=True)
+}
 
-def render_header():
-    st.markdown("""
-    <div class="hero-container">
-        <span class="de-studio">DE STUDIO</span>
-        <h1 class="main-title">
-            DARKRELAY
-            <span class="title-accent">Anonymous Encrypted Platform</span>
-        </h1>
-        <div class="tagline">
-            Complete anonymity. Military-grade encryption. Zero persistence.
-        </div>
+/* One-shot entrances only, and only when the user allows motion. The feed
+   is re-created whenever a message arrives, so only the newest bubble slides */
+@media (prefers-reduced-motion: no-preference) {
+    .hero-container { animation: fadeIn 0.8s ease-in; }
+    .message-latest { animation: slideIn 0.3s ease-out; }
+}
+
+/* Scrollbar */
+::-webkit-scrollbar {
+    width: 8px;
+}
+
+::-webkit-scrollbar-track {
+    background: rgba(255, 255, 255, 0.05);
+    border-radius: 4px;
+}
+
+::-webkit-scrollbar-thumb {
+    background: #8a63d2;
+    border-radius: 4px;
+}
+
+/* Hide default */
+#MainMenu {visibility: hidden;}
+footer {visibility: hidden;}
+header {visibility: hidden;}
+
+/* Responsive */
+@media (max-width: 768px) {
+    .main-title { font-size: 2rem; }
+    .creation-card { padding: 1.5rem; }
+}
+"""
+
+@st.cache_resource
+def _style_block(css: str) -> str:
+    # Streamlit re-executes this script on every rerun, so minify once per
+    # process here: strip comments, collapse whitespace, drop it around punctuation
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};:,])\s*', r'\1', css).strip()
+    return f"<style>{css}</style>"
+
+def inject_styles():
+    # Streamlit drops any element a rerun does not emit, so the stylesheet is
+    # written every run; only the minified block is cached.
+    st.markdown(_FONT_LINKS + _style_block(_CSS_RAW), unsafe_allow_html=True)
+
+_HEADER_HTML = """
+<div class="hero-container">
+    <span class="de-studio">DE STUDIO</span>
+    <h1 class="main-title">
+        DARKRELAY
+        <span class="title-accent">Anonymous Encrypted Platform</span>
+    </h1>
+    <div class="tagline">
+        Complete anonymity. Military-grade encryption. Zero persistence.
     </div>
-    """, unsafe_allow_html=True)
+</div>
+"""
+
+_FOOTER_HTML = f"""
+<div style="text-align:center; margin-top:3rem; opacity:0.6; font-size:0.85rem;">
+    <span style="margin:0 1rem;">🔒 Ephemeral</span>
+    <span style="margin:0 1rem;">⏱️ {InMemoryGlobalState.ROOM_TTL // 60}min TTL</span>
+    <span style="margin:0 1rem;">💬 Max {InMemoryGlobalState.MAX_MESSAGES} msgs</span>
+    <span style="margin:0 1rem;">🗑️ No logs</span>
+</div>
+"""
+
+def render_header():
+    st.markdown(_HEADER_HTML, unsafe_allow_html=True)
 
 # ====================
 # SESSION & UI
 # ====================
+_SESSION_DEFAULTS = {
+    'current_room': None,
+    'room_name': "",
+    'msg_key': 0,
+    'view_limit': 50,
+}
+
 def init_session():
+    if st.session_state.get('_initialized'):
+        return
     if 'user_id' not in st.session_state:
-        st.session_state.user_id = f"user_{uuid.uuid4().hex[:6]}"
-    if 'current_room' not in st.session_state:
-        st.session_state.current_room = None
-    if 'room_name' not in st.session_state:
-        st.session_state.room_name = ""
-    if 'msg_key' not in st.session_state:
-        st.session_state.msg_key = 0
+        uid = secrets.token_bytes(3)
+        st.session_state.user_id_bytes = uid
+        st.session_state.user_id = f"user_{uid.hex()}"
+        st.session_state.user_label = f"User_{uid.hex()[-4:]}"
+    for key, value in _SESSION_DEFAULTS.items():
+        st.session_state.setdefault(key, value)
+    st.session_state._initialized = True
 
 def generate_room_id(name: str) -> str:
     clean = re.sub(r'[^a-zA-Z0-9]', '', name)[:4].upper()
     if not clean:
         clean = "ROOM"
-    unique = uuid.uuid4().hex[:4].upper()
+    unique = secrets.token_hex(2).upper()
     return f"{clean}-{unique}"
 
+_CREATE_CARD_HTML = '<div class="creation-card"><div class="card-title">🔐 CREATE CHANNEL</div></div>'
+_JOIN_CARD_HTML = '<div class="creation-card"><div class="card-title">🔗 JOIN CHANNEL</div></div>'
+
 def create_room_ui():
-    st.markdown('<div class="creation-card">', unsafe_allow_html=True)
-    st.markdown('<div class="card-title">🔐 CREATE CHANNEL</div>', unsafe_allow_html=True)
+    st.markdown(_CREATE_CARD_HTML, unsafe_allow_html=True)
     
     col1, col2 = st.columns([3, 1])
     with col1:
-        name = st.text_input("Name", placeholder="Enter channel name...", key="new_name", label_visibility="collapsed")
+        st.text_input("Name", placeholder="Enter channel name...", key="new_name", label_visibility="collapsed")
     with col2:
-        if st.button("CREATE", type="primary"):
-            if name.strip():
-                rid = generate_room_id(name.strip())
-                state = get_global_state()
-                if state.create_room(rid, name.strip()):
-                    st.session_state.current_room = rid
-                    st.session_state.room_name = name.strip()
-                    st.rerun()
-                else:
-                    st.error("Error creating channel")
+        st.button("CREATE", type="primary", on_click=create_channel)
     
-    st.markdown('</div>', unsafe_allow_html=True)
+    error = st.session_state.pop("create_error", None)
+    if error:
+        st.error(error)
 
 def join_room_ui():
-    st.markdown('<div class="creation-card">', unsafe_allow_html=True)
-    st.markdown('<div class="card-title">🔗 JOIN CHANNEL</div>', unsafe_allow_html=True)
-    
-    rid = st.text_input("ID", placeholder="Enter channel ID...", key="join_id", label_visibility="collapsed")
-    if st.button("JOIN CHANNEL", use_container_width=True):
-        if rid.strip():
-            state = get_global_state()
-            data = state.get_room(rid.strip())
-            if data:
-                st.session_state.current_room = rid.strip()
-                st.session_state.room_name = data.get("name", "Unknown")
-                st.rerun()
-            else:
-                st.error("Channel not found")
+    st.markdown(_JOIN_CARD_HTML, unsafe_allow_html=True)
     
-    st.markdown('</div>', unsafe_allow_html=True)
+    st.text_input("ID", placeholder="Enter channel ID...", key="join_id", label_visibility="collapsed")
+    st.button("JOIN CHANNEL", use_container_width=True, on_click=join_channel)
+    
+    error = st.session_state.pop("join_error", None)
+    if error:
+        st.error(error)
+
+# Navigation runs as button callbacks, ahead of the script rerun the click
+# already triggers, so the new page renders without a second st.rerun()
+def create_channel():
+    name = st.session_state.new_name.strip()
+    if not name:
+        return
+    rid = sys.intern(generate_room_id(name))
+    if get_global_state().create_room(rid, name):
+        st.session_state.current_room = rid
+        st.session_state.room_name = name
+    else:
+        st.session_state.create_error = "Error creating channel"
+
+def join_channel():
+    rid = st.session_state.join_id.strip()
+    if not rid:
+        return
+    name = get_global_state().get_room_name(rid)
+    if name is not None:
+        # Interned only once the room exists: interned strings are never freed
+        st.session_state.current_room = sys.intern(rid)
+        st.session_state.room_name = name
+    else:
+        st.session_state.join_error = "Channel not found"
+
+def leave_channel():
+    st.session_state.current_room = None
+    st.session_state.view_limit = _SESSION_DEFAULTS['view_limit']
+
+def load_older():
+    st.session_state.view_limit += 50
 
 # ====================
 # CHAT INTERFACE
 # ====================
+_ENCRYPTED_HTML = (
+    '<div class="message">'
+    '<div class="message-content" style="opacity:0.5">[Encrypted]</div>'
+    '</div>'
+)
+
+def render_bubble(cipher: EncryptionHandler, msg: Message, is_me: bool, latest: bool) -> str:
+    try:
+        text = cipher.decrypt_cached(msg.encrypted_message)
+    except Exception:
+        # Returned rather than raised so the cache remembers the failure and
+        # the bad ciphertext is not re-authenticated on every poll
+        return _ENCRYPTED_HTML
+    user = "You" if is_me else msg.user_label
+    css_class = "message message-own" if is_me else "message"
+    if latest:
+        css_class += " message-latest"
+    return (
+        f'<div class="{css_class}">'
+        f'<div class="message-header"><span>{user}</span>'
+        f'<span class="message-time">{msg.time_str}</span></div>'
+        f'<div class="message-content">{text}</div>'
+        '<div class="message-meta">✓ Verified</div>'
+        '</div>'
+    )
+
 def chat_ui():
     if not st.session_state.current_room:
         return
     
     state = get_global_state()
-    room_data = state.get_room(st.session_state.current_room)
+    # The header only needs the name; chat_feed takes the message snapshot
+    room_name = state.get_room_name(st.session_state.current_room)
     
-    if not room_data:
+    if room_name is None:
         st.error("Channel expired")
-        st.session_state.current_room = None
+        leave_channel()
         st.rerun()
         return
     
@@ -517,7 +725,7 @@ def chat_ui():
     with col1:
         st.markdown(f"""
         <div class="room-header">
-            <div class="room-title">🔒 {room_data.get('name', 'Unknown')}</div>
+            <div class="room-title">🔒 {html.escape(room_name)}</div>
             <div class="room-id">{st.session_state.current_room}</div>
             <div class="status-bar">
                 <div class="status-dot"></div>
@@ -527,90 +735,105 @@ def chat_ui():
         """, unsafe_allow_html=True)
     
     with col2:
-        if st.button("LEAVE", type="secondary", use_container_width=True):
-            st.session_state.current_room = None
-            st.rerun()
+        st.button("LEAVE", type="secondary", use_container_width=True, on_click=leave_channel)
     
-    # Messages
-    st.markdown('<div class="chat-container">', unsafe_allow_html=True)
+    room_id = st.session_state.current_room
+    chat_feed(room_id)
+    
+    # Input stays outside the polling fragment so a tick never touches it
+    st.markdown('<div class="input-area">', unsafe_allow_html=True)
+    c1, c2 = st.columns([4, 1])
+    with c1:
+        st.text_input("Message", key=f"msg_{st.session_state.msg_key}", 
+                      placeholder="Type message...", label_visibility="collapsed")
+    with c2:
+        st.button("SEND", type="primary", use_container_width=True,
+                  on_click=send_message, args=(room_id,))
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    warning = st.session_state.pop("send_warning", None)
+    if warning:
+        st.warning(warning)
+
+@st.fragment(run_every=2)
+def chat_feed(room_id: str):
+    # Only the message list polls; other users' messages show up within a
+    # tick without rerunning the header, stylesheet or input
+    state = get_global_state()
+    limit = st.session_state.view_limit
+    room = state.get_room(room_id, limit)
+    
+    if room is None:
+        st.rerun()
     
-    messages = room_data.get("messages", [])
-    key = state.get_room_key(st.session_state.current_room)
+    # Messages
+    messages = room.messages
+    cipher = state.get_room_cipher(room_id)
     
-    if not key:
+    if not cipher:
         st.error("Encryption error")
-        st.markdown('</div>', unsafe_allow_html=True)
         return
     
-    cipher = EncryptionHandler(key)
+    # Stored messages never change, so each bubble is rendered once per
+    # (message, own, latest) and kept until the room expires
+    render = state.get_bubble_cache(
+        room_id, lambda: functools.lru_cache(maxsize=512)(functools.partial(render_bubble, cipher))
+    )
+    if render is None:
+        st.rerun()
     
     if not messages:
         st.info("💬 No messages yet. Start the conversation...")
+    else:
+        # Only the newest view_limit messages are rendered; older ones on demand
+        if room.count > limit:
+            st.button("LOAD OLDER", use_container_width=True, on_click=load_older)
+        
+        # Build the whole history as one element instead of one per message
+        parts = ['<div class="chat-container">']
+        user_id = st.session_state.user_id
+        for msg in messages:
+            parts.append(render(msg, msg.user_id == user_id, msg is messages[-1]))
+        parts.append('</div>')
+        st.markdown("".join(parts), unsafe_allow_html=True)
+
+def send_message(room_id: str):
+    # Runs as the SEND callback, before the rerun the click triggers, so the
+    # new message is rendered in that same pass without an extra st.rerun()
+    new_msg = st.session_state.get(f"msg_{st.session_state.msg_key}", "")
+    if not new_msg or not new_msg.strip():
+        return
     
-    for msg in messages[-50:]:
-        try:
-            text = cipher.decrypt(msg["encrypted_message"])
-            ts = datetime.fromtimestamp(msg["timestamp"]).strftime("%H:%M")
-            is_me = msg.get("user_id") == st.session_state.user_id
-            user = "You" if is_me else f"User_{msg.get('user_id', 'unknown')[-4:]}"
-            css_class = "message message-own" if is_me else "message"
-            
-            st.markdown(f"""
-            <div class="{css_class}">
-                <div class="message-header">
-                    <span>{user}</span>
-                    <span class="message-time">{ts}</span>
-                </div>
-                <div class="message-content">{text}</div>
-                <div class="message-meta">✓ Verified</div>
-            </div>
-            """, unsafe_allow_html=True)
-        except:
-            st.markdown("""
-            <div class="message">
-                <div class="message-content" style="opacity:0.5">[Encrypted]</div>
-            </div>
-            """, unsafe_allow_html=True)
+    state = get_global_state()
+    cipher = state.get_room_cipher(room_id)
+    if not cipher:
+        return
     
-    st.markdown('</div>', unsafe_allow_html=True)
+    if not state.check_rate_limit(st.session_state.user_id):
+        st.session_state.send_warning = "Slow down!"
+        return
     
-    # Input
-    st.markdown('<div class="input-area">', unsafe_allow_html=True)
-    c1, c2 = st.columns([4, 1])
-    with c1:
-        new_msg = st.text_input("Message", key=f"msg_{st.session_state.msg_key}", 
-                               placeholder="Type message...", label_visibility="collapsed")
-    with c2:
-        send = st.button("SEND", type="primary", use_container_width=True)
-    st.markdown('</div>', unsafe_allow_html=True)
+    clean = sanitize_message(new_msg.strip())
+    if len(clean) > 500:
+        st.session_state.send_warning = "Message too long"
+        return
     
-    if send and new_msg and new_msg.strip():
-        if not state.check_rate_limit(st.session_state.user_id):
-            st.warning("Slow down!")
-            return
-        
-        clean = sanitize_message(new_msg.strip())
-        if len(clean) > 500:
-            st.warning("Message too long")
-            return
-        
-        prev_hash = messages[-1].get("hash", "0"*64) if messages else "0"*64
-        enc = cipher.encrypt(clean)
-        hash_data = f"{enc}{prev_hash}{time.time()}"
-        curr_hash = cipher.calculate_hash(hash_data)
-        
-        msg_data = {
-            "encrypted_message": enc,
-            "timestamp": time.time(),
-            "hash": curr_hash,
-            "previous_hash": prev_hash,
-            "user_id": st.session_state.user_id,
-            "message_id": str(uuid.uuid4()),
-        }
-        
-        if state.add_message(st.session_state.current_room, msg_data):
-            st.session_state.msg_key += 1
-            st.rerun()
+    enc = cipher.encrypt(clean)
+    ts_ns = time.time_ns()
+    prefix = cipher.hash_prefix(room_id, st.session_state.user_id_bytes)
+    
+    message = Message(
+        message_id=secrets.token_hex(8),
+        user_id=st.session_state.user_id,
+        encrypted_message=enc,
+        timestamp_ns=ts_ns,
+        # Display strings never change, so format them once here
+        time_str=datetime.fromtimestamp(ts_ns / 1e9).strftime("%H:%M"),
+        user_label=st.session_state.user_label,
+    )
+    
+    if state.add_message(room_id, message, prefix):
+        st.session_state.msg_key += 1
 
 # ====================
 # MAIN
@@ -636,14 +859,7 @@ def main():
         with c2:
             join_room_ui()
         
-        st.markdown("""
-        <div style="text-align:center; margin-top:3rem; opacity:0.6; font-size:0.85rem;">
-            <span style="margin:0 1rem;">🔒 Ephemeral</span>
-            <span style="margin:0 1rem;">⏱️ 30min TTL</span>
-            <span style="margin:0 1rem;">💬 Max 200 msgs</span>
-            <span style="margin:0 1rem;">🗑️ No logs</span>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_FOOTER_HTML, unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main()